@@ -1,11 +1,65 @@
+import csv
+import io
+import json
 import logging
+import os
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlencode, urljoin
 
+import requests
 from simple_salesforce import Salesforce
-from simple_salesforce.exceptions import SalesforceAuthenticationFailed, SalesforceError
-from typing import Any, get_args
+from simple_salesforce.exceptions import SalesforceAuthenticationFailed, SalesforceError, SalesforceGeneralError, \
+    SalesforceResourceNotFound
+from typing import Any, Iterator
 
-from data_classes import PermissionSet, ObjectPermissions, FieldPermissions, SetupEntityAccess, OBJECT_PERMISSIONS, \
-    FIELD_PERMISSIONS, PermissionSetTabSetting, SystemPermission
+from data_classes import PermissionSet, ObjectPermissions, FieldPermissions, SetupEntityAccess, OBJECT_PERM_NAMES, \
+    FIELD_PERM_NAMES, PermissionSetTabSetting, SystemPermission, intern_system_permission, intern_setup_entity_access, \
+    intern_tab_setting
+
+log = logging.getLogger(__name__)
+
+# The Bulk API 2.0 resultPages endpoint used to download query results in parallel requires API version 63.0 or later
+API_VERSION = '63.0'
+
+# Keep "WHERE Id IN (...)" clauses well below the SOQL query length limit
+QUERY_CHUNK_SIZE = 200
+# query_all() sends the SOQL query in the URL of a GET request, and Salesforce rejects URLs longer than about 16 KB
+QUERY_MAX_URL_LENGTH = 16000
+# https://developer.salesforce.com/docs/atlas.en-us.api_rest.meta/api_rest/resources_composite_batch.htm
+COMPOSITE_BATCH_MAX_SIZE = 25
+
+# With --bulk-api, queries returning at least that many records (ie: more than one REST API page) use the Bulk API 2.0
+BULK_API_MIN_RECORDS = 2000
+BULK_API_POLL_INTERVAL_SECONDS = 2
+BULK_API_JOB_TIMEOUT_SECONDS = 30 * 60
+# Up to two bulk queries (object and field permissions) run alongside the other loaders of main(), keep the total number of
+# concurrent requests within the limit of main.MAX_WORKERS
+BULK_API_DOWNLOAD_WORKERS = 2
+
+# The PermissionSet describe result rarely changes, so it is cached on disk
+SYSTEM_PERMS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "permsetfinder")
+SYSTEM_PERMS_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+_BULK_API_BOOLEANS = {'true': True, 'false': False}
+
+
+def _chunks(ids: list[str], size: int = QUERY_CHUNK_SIZE) -> Iterator[list[str]]:
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def _in_clause(ids: list[str]) -> str:
+    return ",".join(f"'{next_id}'" for next_id in ids)
+
+
+def _url_chunk_size(query_template: str, sample_id: str) -> int:
+    """Number of ids that can be formatted into query_template before its URL gets longer than QUERY_MAX_URL_LENGTH"""
+    query_length = len(urlencode({'q': query_template.format(ids="")}))
+    id_length = len(urlencode({'q': _in_clause([sample_id, sample_id])})) - len(urlencode({'q': _in_clause([sample_id])}))
+    return max(1, min(QUERY_CHUNK_SIZE, (QUERY_MAX_URL_LENGTH - query_length) // id_length))
 
 
 class Connection:
@@ -16,7 +70,9 @@ class Connection:
                  password: str,
                  security_token: str | None = None,
                  domain: str = 'login',
-                 sandbox: bool = False):
+                 sandbox: bool = False,
+                 use_bulk_api: bool = False,
+                 version: str = API_VERSION):
         """
         Initialize Salesforce connector.
 
@@ -26,13 +82,23 @@ class Connection:
             security_token: Security token (optional, will prompt if needed)
             domain: Salesforce domain (login, test, or custom)
             sandbox: Whether to connect to sandbox
+            use_bulk_api: Whether to use the Bulk API 2.0 for large object and field permission queries
+            version: Salesforce API version
         """
         self.username = username
         self.password = password
         self.security_token = security_token
         self.domain = domain
         self.sandbox = sandbox
+        self.use_bulk_api = use_bulk_api
+        self.version = version
         self.sf:Salesforce = None  # type: ignore
+        # The SOQL queries are built once: the get_*_bulk methods only format the ids of the permission sets
+        self._parent_id_filter = "ParentId IN ({ids})"
+        self._object_perms_fields = f"ParentId, SobjectType, {','.join(OBJECT_PERM_NAMES)}"
+        self._field_perms_fields = f"ParentId, SobjectType, Field, {','.join(FIELD_PERM_NAMES)}"
+        self._setup_entity_access_query = f"SELECT ParentId, SetupEntityId, SetupEntityType FROM SetupEntityAccess WHERE {self._parent_id_filter}"
+        self._tab_setting_query = f"SELECT ParentId, Name, Visibility FROM PermissionSetTabSetting WHERE {self._parent_id_filter}"
 
     def connect(self) -> bool:
         """
@@ -42,13 +108,14 @@ class Connection:
             bool: True if connection successful, False otherwise
         """
         try:
-            logging.info(f"Connecting to Salesforce as {self.username}...")
+            log.info("Connecting to Salesforce as %s...", self.username)
 
             # Build connection parameters
             connection_params:dict[str, Any] = {
                 'username': self.username,
                 'password': self.password,
-                'domain': self.domain
+                'domain': self.domain,
+                'version': self.version
             }
 
             # Add security token if provided
@@ -69,37 +136,184 @@ class Connection:
             test_query = self.sf.query("SELECT Id FROM User LIMIT 1")
 
             if test_query['records']:
-                logging.info(f"✅ Successfully connected to Salesforce!")
+                log.info("✅ Successfully connected to Salesforce!")
                 return True
             else:
-                logging.info("❌ Connection failed: Could not retrieve user information")
+                log.info("❌ Connection failed: Could not retrieve user information")
                 return False
 
         except SalesforceAuthenticationFailed as e:
-            logging.info(f"❌ Authentication failed: {str(e)}")
-            logging.info("💡 Tip: You might need a security token. Get it from:")
-            logging.info("   Setup → My Personal Information → Reset My Security Token")
+            log.info("❌ Authentication failed: %s", e)
+            log.info("💡 Tip: You might need a security token. Get it from:")
+            log.info("   Setup → My Personal Information → Reset My Security Token")
             return False
         except SalesforceError as e:
-            logging.info(f"❌ Salesforce error: {str(e)}")
+            log.info("❌ Salesforce error: %s", e)
             return False
         except Exception as e:
-            logging.info(f"❌ Unexpected error: {str(e)}")
+            log.info("❌ Unexpected error: %s", e)
             return False
 
+    def _restful(self, path: str, **kwargs: Any) -> dict[str, Any]:
+        # restful() returns None for responses without content, which the resources used here never send
+        response = self.sf.restful(path, **kwargs)
+        if response is None:
+            raise SalesforceGeneralError(path, 204, path, b"")
+        return response
+
+    def _composite_batch(self, queries: list[str]) -> list[list[dict[str, Any]]]:
+        """
+        Run several SOQL queries using as few HTTP round-trips as possible.
+
+        Only the first page of each query result is returned, so this is meant for queries returning less than 2000 records.
+
+        Returns:
+            list: the records of each query, in the same order as the queries
+        """
+        result: list[list[dict[str, Any]]] = list()
+        for i in range(0, len(queries), COMPOSITE_BATCH_MAX_SIZE):
+            batch_requests = [{'method': 'GET', 'url': f"/services/data/v{self.sf.sf_version}/query/?q={quote(query)}"}
+                              for query in queries[i:i + COMPOSITE_BATCH_MAX_SIZE]]
+            response = self._restful('composite/batch', method='POST', json={'batchRequests': batch_requests})
+            for next_result in response['results']:
+                if next_result['statusCode'] != 200:
+                    raise SalesforceGeneralError('composite/batch', next_result['statusCode'], 'composite/batch',
+                                                 json.dumps(next_result['result']).encode())
+                result.append(next_result['result']['records'])
+        return result
+
+    def _query_records(self, sobject_name: str, fields: str, where: str) -> list[dict[str, Any]]:
+        """
+        Return all the records of "SELECT {fields} FROM {sobject_name} WHERE {where}".
+
+        When the Bulk API is enabled and the query returns at least BULK_API_MIN_RECORDS records, the first REST API page is
+        dropped and the records are retrieved using a Bulk API 2.0 query job instead of being paginated through the REST API.
+        """
+        query = f"SELECT {fields} FROM {sobject_name} WHERE {where}"
+        if not self.use_bulk_api:
+            return self.sf.query_all(query)['records']
+        # The first page tells how many records there are, so small results don't cost an extra round-trip
+        response = self.sf.query(query)
+        if not response['done'] and response['totalSize'] >= BULK_API_MIN_RECORDS:
+            log.debug("_query_records: using the Bulk API for %s %s records", response['totalSize'], sobject_name)
+            return self._bulk_query(sobject_name, query)
+        records: list[dict[str, Any]] = response['records']
+        while not response['done']:
+            response = self.sf.query_more(response['nextRecordsUrl'], identifier_is_url=True)
+            records.extend(response['records'])
+        return records
+
+    def _bulk_query(self, sobject_name: str, query: str) -> list[dict[str, Any]]:
+        # https://developer.salesforce.com/docs/atlas.en-us.api_asynch.meta/api_asynch/queries.htm
+        job = self._restful('jobs/query', method='POST', json={'operation': 'query', 'query': query})
+        job_id = job['id']
+        deadline = time.monotonic() + BULK_API_JOB_TIMEOUT_SECONDS
+        while job['state'] not in ('JobComplete', 'Failed', 'Aborted'):
+            if time.monotonic() > deadline:
+                self.sf.restful(f'jobs/query/{job_id}', method='PATCH', json={'state': 'Aborted'})
+                raise SalesforceGeneralError(f'jobs/query/{job_id}', 408, sobject_name,
+                                             f"Bulk query job did not complete within {BULK_API_JOB_TIMEOUT_SECONDS}s".encode())
+            time.sleep(BULK_API_POLL_INTERVAL_SECONDS)
+            job = self._restful(f'jobs/query/{job_id}')
+        if job['state'] != 'JobComplete':
+            raise SalesforceGeneralError(f'jobs/query/{job_id}', 200, sobject_name, json.dumps(job).encode())
+
+        try:
+            result_links = self._get_bulk_result_links(job_id)
+        except SalesforceResourceNotFound:
+            # The resultPages endpoint requires API version 63.0 or later: download the result pages one after the other
+            log.debug("_bulk_query: resultPages not available, downloading results sequentially")
+            pages = self._get_bulk_results_sequentially(job_id)
+        else:
+            with ThreadPoolExecutor(max_workers=BULK_API_DOWNLOAD_WORKERS) as executor:
+                pages = list(executor.map(lambda link: self._get_csv(f"https://{self.sf.sf_instance}{link}").text,
+                                          result_links))
+
+        result: list[dict[str, Any]] = list()
+        for next_page in pages:
+            # Each page is a standalone CSV document with its own header line
+            for next_row in csv.DictReader(io.StringIO(next_page)):
+                # Unlike the REST API, the Bulk API returns CSV where booleans are "true" / "false" strings
+                result.append({key: _BULK_API_BOOLEANS.get(value, value) for key, value in next_row.items()})
+        return result
+
+    def _get_bulk_result_links(self, job_id: str) -> list[str]:
+        # https://developer.salesforce.com/docs/atlas.en-us.api_asynch.meta/api_asynch/query_get_job_results_parallel.htm
+        result: list[str] = list()
+        response = self._restful(f'jobs/query/{job_id}/resultPages')
+        result.extend(page['resultLink'] for page in response['resultPages'])
+        while response.get('nextRecordsUrl'):
+            # nextRecordsUrl is relative to the instance, not to the versioned base_url restful() prepends
+            response = self._get_json(urljoin(self.sf.base_url, response['nextRecordsUrl']))
+            result.extend(page['resultLink'] for page in response['resultPages'])
+        return result
+
+    def _get_bulk_results_sequentially(self, job_id: str) -> list[str]:
+        result: list[str] = list()
+        locator = ""
+        while True:
+            response = self._get_csv(f"{self.sf.base_url}jobs/query/{job_id}/results",
+                                     params={'locator': locator} if locator else None)
+            result.append(response.text)
+            locator = response.headers.get('Sforce-Locator', 'null')
+            if locator == 'null':
+                return result
+
+    def _get_json(self, url: str) -> dict[str, Any]:
+        response = self.sf.session.get(url, headers=self.sf.headers)
+        response.raise_for_status()
+        return response.json()
+
+    def _get_csv(self, url: str, params: dict[str, str] | None = None) -> requests.Response:
+        response = self.sf.session.get(url, params=params, headers={**self.sf.headers, 'Accept': 'text/csv'})
+        response.raise_for_status()
+        return response
+
+    def _get_system_perms_cache_file(self) -> str:
+        # The session id starts with the org id, so sandboxes and production orgs don't share the same cache file
+        org_id = self.sf.session_id.split('!')[0]
+        return os.path.join(SYSTEM_PERMS_CACHE_DIR, f"sysperms_{org_id}_v{self.sf.sf_version}.json")
+
+    @staticmethod
+    def _write_system_perms_cache_file(cache_file: str, perms: list[SystemPermission]) -> None:
+        # Written to a temporary file which is then renamed, so that concurrent runs never see a partially written file
+        cache_dir = os.path.dirname(cache_file)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=cache_dir, suffix=".tmp", delete=False) as file:
+                json.dump([p.name for p in perms], file)
+            try:
+                os.replace(file.name, cache_file)
+            except OSError:
+                os.remove(file.name)
+                raise
+        except OSError as e:
+            log.debug("_write_system_perms_cache_file: can't write cache file %s: %s", cache_file, e)
+
     def get_all_system_perms(self) -> list[SystemPermission]:
-        logging.debug(f">> get_all_system_perms")
+        log.debug(">> get_all_system_perms")
+        cache_file = self._get_system_perms_cache_file()
+        # The cache is best-effort: if it can't be read, the perms are loaded from Salesforce
+        try:
+            if time.time() - os.path.getmtime(cache_file) < SYSTEM_PERMS_CACHE_TTL_SECONDS:
+                with open(cache_file) as file:
+                    cached_perms = [intern_system_permission(name) for name in json.load(file)]
+                log.debug("<< get_all_system_perms: returning nb cached perms=%s", len(cached_perms))
+                return cached_perms
+        except (OSError, ValueError) as e:
+            log.debug("get_all_system_perms: can't read cache file %s: %s", cache_file, e)
         result:list[SystemPermission] = list()
         # https://simple-salesforce.readthedocs.io/en/latest/user_guide/misc.html
         ps = self.sf.PermissionSet.describe()  # type: ignore
         for field in ps['fields']:
             if field['name'].startswith("Permissions"):
-                result.append(SystemPermission(name=field['name']))
-        logging.debug(f"<< get_all_system_perms: returning nb perms={len(result)}")
+                result.append(intern_system_permission(field['name']))
+        self._write_system_perms_cache_file(cache_file, result)
+        log.debug("<< get_all_system_perms: returning nb perms=%s", len(result))
         return result
 
     def get_permsets(self) -> list[PermissionSet]:
-        logging.debug(f">> get_permsets")
+        log.debug(">> get_permsets")
         result: list[PermissionSet] = list()
         # https://developer.salesforce.com/docs/atlas.en-us.object_reference.meta/object_reference/sforce_api_objects_permissionset.htm
         query = """
@@ -109,22 +323,25 @@ class Connection:
                 ORDER BY Name
                 """
         response = self.sf.query_all(query)
-        for ps in response['records']:
-            license_id = ps.get('LicenseId')
-            psl:str | None = None
-            ul:str | None = None
-            if license_id:
-                psl_query = f"SELECT Id, MasterLabel FROM PermissionSetLicense WHERE Id ='{license_id}'"
-                psl_result = self.sf.query_all(psl_query)
-                if psl_result['records']:
-                    psl_result = psl_result['records'][0]
-                    psl = psl_result['MasterLabel']
+        # Each license is only queried once, however many permission sets use it
+        license_ids = sorted({ps['LicenseId'] for ps in response['records'] if ps.get('LicenseId')})
+        psl_by_id: dict[str, str] = {}
+        ul_by_id: dict[str, str] = {}
+        license_queries: list[str] = []
+        for next_chunk in _chunks(license_ids):
+            license_queries.append(f"SELECT Id, MasterLabel FROM PermissionSetLicense WHERE Id IN ({_in_clause(next_chunk)})")
+            license_queries.append(f"SELECT Id, Name FROM UserLicense WHERE Id IN ({_in_clause(next_chunk)})")
+        for next_records in self._composite_batch(license_queries):
+            for next_record in next_records:
+                if next_record['attributes']['type'] == 'PermissionSetLicense':
+                    psl_by_id[next_record['Id']] = next_record['MasterLabel']
                 else:
-                    ul_query = f"SELECT Id, Name FROM UserLicense WHERE Id ='{license_id}'"
-                    ul_result = self.sf.query_all(ul_query)
-                    if ul_result['records']:
-                        ul_result = ul_result['records'][0]
-                        ul = ul_result['Name']
+                    ul_by_id[next_record['Id']] = next_record['Name']
+
+        for ps in response['records']:
+            psl: str | None = psl_by_id.get(ps.get('LicenseId'))
+            # A permission set license takes precedence over a user license
+            ul: str | None = None if psl else ul_by_id.get(ps.get('LicenseId'))
 
             permset = PermissionSet(id=ps['Id'],
                                     name=ps['Name'],
@@ -133,95 +350,79 @@ class Connection:
                                     permission_set_license=psl
                                     )
             result.append(permset)
-        logging.debug(f"<< get_permsets: returning nb permsets={len(result)}")
+        log.debug("<< get_permsets: returning nb permsets=%s", len(result))
         return result
 
-    def get_system_perms(self, permset_id: str, all_perms: list[SystemPermission]) -> list[SystemPermission]:
-        logging.debug(f">> get_system_perms: permset_id={permset_id}")
-        result:list[SystemPermission] = list()
-        all_perm_names = [p.name for p in all_perms]
-        query = f"""
-                SELECT Id, Name, {",".join(all_perm_names)}
-                FROM PermissionSet 
-                WHERE Id = '{permset_id}' 
-                """
-        response = self.sf.query_all(query)
-        response = response['records'][0]
-        for next_perm in all_perms:
-            if next_perm.name in response and response[next_perm.name] is True:
-                result.append(next_perm)
-        logging.debug(f"<< get_system_perms: returning nb records={len(result)}")
+    def get_system_perms_bulk(self, permset_ids: list[str], all_perms: list[SystemPermission]) -> dict[str, list[SystemPermission]]:
+        log.debug(">> get_system_perms_bulk: nb permset_ids=%s", len(permset_ids))
+        result: dict[str, list[SystemPermission]] = {permset_id: [] for permset_id in permset_ids}
+        query_template = f"SELECT Id, {','.join(p.name for p in all_perms)} FROM PermissionSet WHERE Id IN ({{ids}})"
+        # The query already selects hundreds of Permissions* fields, so the chunks are sized from its URL length
+        chunk_size = _url_chunk_size(query_template, permset_ids[0]) if permset_ids else QUERY_CHUNK_SIZE
+        log.debug("get_system_perms_bulk: chunk size=%s", chunk_size)
+        for next_chunk in _chunks(permset_ids, chunk_size):
+            query = query_template.format(ids=_in_clause(next_chunk))
+            response = self.sf.query_all(query)
+            for next_record in response['records']:
+                result[next_record['Id']] = [p for p in all_perms if next_record.get(p.name) is True]
+        log.debug("<< get_system_perms_bulk: returning nb permsets=%s", len(result))
         return result
 
-    def get_object_perms(self, permset_id: str) -> list[ObjectPermissions]:
-        logging.debug(f">> get_object_perms: permset_id={permset_id}")
-        result: list[ObjectPermissions] = list()
-        all_perms = list(get_args(OBJECT_PERMISSIONS))
+    def get_object_perms_bulk(self, permset_ids: list[str]) -> dict[str, list[ObjectPermissions]]:
+        log.debug(">> get_object_perms_bulk: nb permset_ids=%s", len(permset_ids))
+        result: dict[str, list[ObjectPermissions]] = defaultdict(list)
         #all_perms = ['PermissionsCreate', 'PermissionsRead', 'PermissionsEdit', 'PermissionsDelete', 'PermissionsViewAllRecords', 'PermissionsModifyAllRecords']
         # Note: some objects like 'Badge' don't have object permissions (access is given via user permissions)
-        query = f"""
-                SELECT SObjectType, {','.join(all_perms)}
-                FROM ObjectPermissions 
-                WHERE ParentId = '{permset_id}' 
-                """
-        response = self.sf.query_all(query)
-        for next_record in response['records']:
-            next_object_perms = [key for key, value in next_record.items() if (value and key in all_perms)]
-            op = ObjectPermissions(
-                sobject_type=next_record['SobjectType'],
-                perms=next_object_perms)
-            result.append(op)
-        logging.debug(f"<< get_object_perms: returning nb records={len(result)}")
+        for next_chunk in _chunks(permset_ids):
+            records = self._query_records(sobject_name="ObjectPermissions",
+                                          fields=self._object_perms_fields,
+                                          where=self._parent_id_filter.format(ids=_in_clause(next_chunk)))
+            for next_record in records:
+                next_object_perms = tuple(name for name in OBJECT_PERM_NAMES if next_record.get(name) is True)
+                op = ObjectPermissions(
+                    sobject_type=next_record['SobjectType'],
+                    perms=next_object_perms)
+                result[next_record['ParentId']].append(op)
+        log.debug("<< get_object_perms_bulk: returning nb permsets=%s", len(result))
         return result
 
-    def get_field_perms(self, permset_id: str) -> list[FieldPermissions]:
-        logging.debug(f">> get_field_perms: permset_id={permset_id}")
-        result: list[FieldPermissions] = list()
-        all_perms = list(get_args(FIELD_PERMISSIONS))
+    def get_field_perms_bulk(self, permset_ids: list[str]) -> dict[str, list[FieldPermissions]]:
+        log.debug(">> get_field_perms_bulk: nb permset_ids=%s", len(permset_ids))
+        result: dict[str, list[FieldPermissions]] = defaultdict(list)
         #all_perms = ['PermissionsRead', 'PermissionsEdit']
         # Important: this query actually does not return all FLS, only the custom ones
         # For example, there is some OOTB FLS on the Account object that are not returned here
-        query = f"""
-                SELECT SobjectType, Field, {','.join(all_perms)}
-                FROM FieldPermissions 
-                WHERE ParentId = '{permset_id}'
-                """
-        response = self.sf.query_all(query)
-        for next_record in response['records']:
-            next_object_perms = [key for key, value in next_record.items() if (value and key in all_perms)]
-            fp = FieldPermissions(sobject_type=next_record['SobjectType'],
-                                  sobject_field=next_record['Field'],
-                                  perms=next_object_perms)
-            result.append(fp)
-        logging.debug(f"<< get_field_perms: returning nb records={len(result)}")
+        for next_chunk in _chunks(permset_ids):
+            records = self._query_records(sobject_name="FieldPermissions",
+                                          fields=self._field_perms_fields,
+                                          where=self._parent_id_filter.format(ids=_in_clause(next_chunk)))
+            for next_record in records:
+                next_object_perms = tuple(name for name in FIELD_PERM_NAMES if next_record.get(name) is True)
+                fp = FieldPermissions(sobject_type=next_record['SobjectType'],
+                                      sobject_field=next_record['Field'],
+                                      perms=next_object_perms)
+                result[next_record['ParentId']].append(fp)
+        log.debug("<< get_field_perms_bulk: returning nb permsets=%s", len(result))
         return result
 
-    def get_setup_entity_access(self, permset_id: str) -> list:
-        logging.debug(f">> get_setup_entity_access: permset_id={permset_id}")
-        result: list[SetupEntityAccess] = list()
-        query = f"""
-                SELECT SetupEntityId, SetupEntityType
-                FROM SetupEntityAccess 
-                WHERE ParentId = '{permset_id}'
-                """
-        response = self.sf.query_all(query)
-        for next_record in response['records']:
-            sea = SetupEntityAccess(setup_entity_type=next_record['SetupEntityType'], setup_entity_id=next_record['SetupEntityId'])
-            result.append(sea)
-        logging.debug(f"<< get_setup_entity_access: returning nb records={len(result)}")
+    def get_setup_entity_access_bulk(self, permset_ids: list[str]) -> dict[str, list[SetupEntityAccess]]:
+        log.debug(">> get_setup_entity_access_bulk: nb permset_ids=%s", len(permset_ids))
+        result: dict[str, list[SetupEntityAccess]] = defaultdict(list)
+        for next_chunk in _chunks(permset_ids):
+            response = self.sf.query_all(self._setup_entity_access_query.format(ids=_in_clause(next_chunk)))
+            for next_record in response['records']:
+                sea = intern_setup_entity_access(next_record['SetupEntityType'], next_record['SetupEntityId'])
+                result[next_record['ParentId']].append(sea)
+        log.debug("<< get_setup_entity_access_bulk: returning nb permsets=%s", len(result))
         return result
 
-    def get_tab_setting(self, permset_id: str) -> list:
-        logging.debug(f">> get_tab_setting: permset_id={permset_id}")
-        result: list[PermissionSetTabSetting] = list()
-        query = f"""
-                SELECT Name, Visibility
-                FROM PermissionSetTabSetting 
-                WHERE ParentId = '{permset_id}'
-                """
-        response = self.sf.query_all(query)
-        for next_record in response['records']:
-            psts = PermissionSetTabSetting(name=next_record['Name'], visibility=next_record['Visibility'])
-            result.append(psts)
-        logging.debug(f"<< get_tab_setting: returning nb records={len(result)}")
+    def get_tab_setting_bulk(self, permset_ids: list[str]) -> dict[str, list[PermissionSetTabSetting]]:
+        log.debug(">> get_tab_setting_bulk: nb permset_ids=%s", len(permset_ids))
+        result: dict[str, list[PermissionSetTabSetting]] = defaultdict(list)
+        for next_chunk in _chunks(permset_ids):
+            response = self.sf.query_all(self._tab_setting_query.format(ids=_in_clause(next_chunk)))
+            for next_record in response['records']:
+                psts = intern_tab_setting(next_record['Name'], next_record['Visibility'])
+                result[next_record['ParentId']].append(psts)
+        log.debug("<< get_tab_setting_bulk: returning nb permsets=%s", len(result))
         return result
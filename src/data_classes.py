@@ -1,11 +1,18 @@
 from dataclasses import dataclass, field
-from typing import Literal, Union
+from functools import cached_property, lru_cache
+from typing import Any, Literal, Union, get_args
 
 
 @dataclass(frozen=True)
 class SystemPermission:
     name: str
 
+# The intern_* factories return a single shared instance per distinct value, instead of one instance per permission set
+
+@lru_cache(maxsize=None)
+def intern_system_permission(name: str) -> SystemPermission:
+    return SystemPermission(name=name)
+
 ENTITY_TYPES = Literal[
     "ApexClass", "ApexPage", "BotDefinition", "ConnectedApplication", "CustomEntityDefinition",
     "CustomPermission", "EmailRoutingAddress", "ExternalClientApplication", "ExternalCredentialParameter",
@@ -19,55 +26,41 @@ class SetupEntityAccess:
     setup_entity_type: ENTITY_TYPES
     setup_entity_id: str
 
+@lru_cache(maxsize=None)
+def intern_setup_entity_access(setup_entity_type: ENTITY_TYPES, setup_entity_id: str) -> SetupEntityAccess:
+    return SetupEntityAccess(setup_entity_type=setup_entity_type, setup_entity_id=setup_entity_id)
+
 OBJECT_PERMISSIONS = Literal['PermissionsCreate', 'PermissionsRead', 'PermissionsEdit', 'PermissionsDelete',
      'PermissionsViewAllRecords', 'PermissionsModifyAllRecords']
+OBJECT_PERM_NAMES: tuple[OBJECT_PERMISSIONS, ...] = get_args(OBJECT_PERMISSIONS)
 
-@dataclass
+@dataclass(frozen=True)
 class ObjectPermissions:
     """
     https://developer.salesforce.com/docs/atlas.en-us.object_reference.meta/object_reference/sforce_api_objects_objectpermissions.htm
     """
     sobject_type: str
-    perms: list[str] = field(default_factory=list)
+    perms: tuple[OBJECT_PERMISSIONS, ...] = ()
 
-    def __eq__(self, other):
-        if not isinstance(other, ObjectPermissions):
-            return NotImplemented
-        # Compare perms as tuple to ensure hashable, order matters
-        return (self.sobject_type, tuple(self.perms)) == (other.sobject_type, tuple(other.perms))
-
-    def __hash__(self):
-        # Convert list to tuple for hashing
-        return hash((self.sobject_type, tuple(self.perms)))
+    def __post_init__(self):
+        # Sorted in the declared order so that equality and hashing don't depend on the order in which perms were given
+        object.__setattr__(self, 'perms', tuple(sorted(self.perms, key=OBJECT_PERM_NAMES.index)))
 
 FIELD_PERMISSIONS = Literal['PermissionsRead', 'PermissionsEdit']
+FIELD_PERM_NAMES: tuple[FIELD_PERMISSIONS, ...] = get_args(FIELD_PERMISSIONS)
 
-@dataclass
+@dataclass(frozen=True)
 class FieldPermissions:
     """
     https://developer.salesforce.com/docs/atlas.en-us.object_reference.meta/object_reference/sforce_api_objects_fieldpermissions.htm
     """
     sobject_type: str
     sobject_field: str
-    perms: list[FIELD_PERMISSIONS] = field(default_factory=list)
+    perms: tuple[FIELD_PERMISSIONS, ...] = ()
 
-    def __eq__(self, other):
-        if not isinstance(other, FieldPermissions):
-            return NotImplemented
-        # Compare perms as tuple for hashable comparison
-        return (
-            self.sobject_type,
-            self.sobject_field,
-            tuple(self.perms)
-        ) == (
-            other.sobject_type,
-            other.sobject_field,
-            tuple(other.perms)
-        )
-
-    def __hash__(self):
-        # Convert list to tuple for hashing
-        return hash((self.sobject_type, self.sobject_field, tuple(self.perms)))
+    def __post_init__(self):
+        # Sorted in the declared order so that equality and hashing don't depend on the order in which perms were given
+        object.__setattr__(self, 'perms', tuple(sorted(self.perms, key=FIELD_PERM_NAMES.index)))
 
 
 TAB_VISIBILITY = Literal['DefaultOff', 'DefaultOn']
@@ -80,6 +73,10 @@ class PermissionSetTabSetting:
     name: str
     visibility: TAB_VISIBILITY
 
+@lru_cache(maxsize=None)
+def intern_tab_setting(name: str, visibility: TAB_VISIBILITY) -> PermissionSetTabSetting:
+    return PermissionSetTabSetting(name=name, visibility=visibility)
+
 ALL_PERMS_TYPE = Union[
     SystemPermission,
     ObjectPermissions,
@@ -88,6 +85,9 @@ ALL_PERMS_TYPE = Union[
     PermissionSetTabSetting,
 ]
 
+_PERMSET_PERMS_FIELDS = frozenset({'system_perms', 'object_perms', 'field_perms', 'setup_entity_access',
+                                   'permission_set_tab_setting'})
+
 @dataclass
 class PermissionSet:
     """
@@ -113,14 +113,19 @@ class PermissionSet:
             prefix = f"(permset_license={self.permission_set_license})"
         return f"{self.label} {prefix}"
 
-    def get_all_perms(self) -> list[ALL_PERMS_TYPE]:
-        all_perms:list[ALL_PERMS_TYPE] = []
-        all_perms.extend(self.system_perms)
-        all_perms.extend(self.object_perms)
-        all_perms.extend(self.field_perms)
-        all_perms.extend(self.setup_entity_access)
-        all_perms.extend(self.permission_set_tab_setting)
-        return all_perms
+    @cached_property
+    def all_perms(self) -> tuple[ALL_PERMS_TYPE, ...]:
+        return (*self.system_perms,
+                *self.object_perms,
+                *self.field_perms,
+                *self.setup_entity_access,
+                *self.permission_set_tab_setting)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        # Reassigning one of the perms lists invalidates the cached all_perms
+        if name in _PERMSET_PERMS_FIELDS:
+            self.__dict__.pop('all_perms', None)
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, PermissionSet):
@@ -136,20 +141,31 @@ class JaccardDifference:
     permset2: PermissionSet
     similarity: float
 
+    @cached_property
+    def _perms1(self) -> frozenset[ALL_PERMS_TYPE]:
+        return frozenset(self.permset1.all_perms)
+
+    @cached_property
+    def _perms2(self) -> frozenset[ALL_PERMS_TYPE]:
+        return frozenset(self.permset2.all_perms)
+
+    @cached_property
+    def _common_perms(self) -> list[ALL_PERMS_TYPE]:
+        return sorted(self._perms1 & self._perms2, key=lambda x: x.__class__.__name__)
+
+    @cached_property
+    def _permset1_unique_perms(self) -> list[ALL_PERMS_TYPE]:
+        return sorted(self._perms1 - self._perms2, key=lambda x: x.__class__.__name__)
+
+    @cached_property
+    def _permset2_unique_perms(self) -> list[ALL_PERMS_TYPE]:
+        return sorted(self._perms2 - self._perms1, key=lambda x: x.__class__.__name__)
+
     def common_perms(self) -> list[ALL_PERMS_TYPE]:
-        perms1 = set(self.permset1.get_all_perms())
-        perms2 = set(self.permset2.get_all_perms())
-        common_perms = perms1.intersection(perms2)
-        return sorted(list(common_perms), key=lambda x: x.__class__.__name__)
+        return self._common_perms
 
     def permset1_unique_perms(self) -> list[ALL_PERMS_TYPE]:
-        perms1 = set(self.permset1.get_all_perms())
-        perms2 = set(self.permset2.get_all_perms())
-        unique_perms1 = perms1 - perms2
-        return sorted(list(unique_perms1), key=lambda x: x.__class__.__name__)
+        return self._permset1_unique_perms
 
     def permset2_unique_perms(self) -> list[ALL_PERMS_TYPE]:
-        perms1 = set(self.permset1.get_all_perms())
-        perms2 = set(self.permset2.get_all_perms())
-        unique_perms2 = perms2 - perms1
-        return sorted(list(unique_perms2), key=lambda x: x.__class__.__name__)
+        return self._permset2_unique_perms
@@ -1,33 +1,170 @@
 import logging
+import math
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
-from data_classes import PermissionSet, JaccardDifference
+from data_classes import PermissionSet, JaccardDifference, ALL_PERMS_TYPE
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional: fall back to the pure Python implementation
+    np = None  # type: ignore
+
+if np is not None and not hasattr(np, "bitwise_count"):  # numpy < 2.0
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+log = logging.getLogger(__name__)
 
 
 class DuplicateFinder:
 
     SIMILARITY_THRESHOLD = 0.9
+    # Below that, starting worker processes costs more than the comparisons themselves
+    PROCESS_POOL_MIN_PERMSETS = 2000
 
     def __init__(self, permsets: list[PermissionSet]) -> None:
         self.permsets = permsets
 
     def jaccard(self) -> list[JaccardDifference]:
-        logging.debug(">> jaccard")
-        duplicates:list[JaccardDifference] = []
-        nb_permsets = len(self.permsets)
-        for i in range(nb_permsets):
-            perms_i = set(self.permsets[i].get_all_perms())
-            for j in range(i + 1, nb_permsets):
-                perms_j = set(self.permsets[j].get_all_perms())
-                intersection = perms_i.intersection(perms_j)
-                union = perms_i.union(perms_j)
-                if union:  # Avoid division by zero
-                    similarity = len(intersection) / len(union)
-                    if similarity >= DuplicateFinder.SIMILARITY_THRESHOLD:
-                        duplicates.append(JaccardDifference(self.permsets[i], self.permsets[j], similarity))
-                if not union and not intersection:
-                    # Both permission sets are empty, consider them identical
-                    duplicates.append(JaccardDifference(self.permsets[i], self.permsets[j], 1.0))
-        logging.debug(f"<< jaccard: returning nb records={len(duplicates)}")
+        log.debug(">> jaccard")
+        perm_sets = [frozenset(p.all_perms) for p in self.permsets]
+        sizes = [len(perms) for perms in perm_sets]
+        # Empty permission sets are identical to each other: instead of reporting all the pairs (which grows
+        # quadratically), each of them is reported once as a duplicate of the first one
+        empty_permsets = [i for i, size in enumerate(sizes) if size == 0]
+        similar_pairs = [(empty_permsets[0], i, 1.0) for i in empty_permsets[1:]]
+        if np is not None:
+            similar_pairs.extend(self._similar_pairs_numpy(perm_sets, sizes))
+        else:
+            similar_pairs.extend(self._similar_pairs_python(perm_sets, sizes))
+        duplicates:list[JaccardDifference] = [JaccardDifference(self.permsets[i], self.permsets[j], similarity)
+                                              for i, j, similarity in similar_pairs]
+        log.debug("<< jaccard: returning nb records=%s", len(duplicates))
         # Sort by similarity descending (most similar first)
         duplicates = sorted(duplicates, key=lambda t: t.similarity, reverse=True)
         return duplicates
+
+    @staticmethod
+    def _similar_pairs_python(perm_sets: list[frozenset[ALL_PERMS_TYPE]], sizes: list[int]) -> list[tuple[int, int, float]]:
+        # Prefix filtering: when the permissions of each set are sorted from the rarest to the most common,
+        # two sets with a similarity >= threshold always share at least one permission in their first
+        # |A| - ceil(threshold * |A|) + 1 permissions, so only those pairs need to be compared
+        frequencies: Counter[ALL_PERMS_TYPE] = Counter(perm for perms in perm_sets for perm in perms)
+        # The order must be the same for all sets, so ties are broken by the position in the Counter
+        rank = {perm: r for r, perm in enumerate(sorted(frequencies, key=lambda perm: frequencies[perm]))}
+        # Permissions are replaced by their rank: ints are cheaper to hash, compare and send to other processes
+        ranked_sets = [frozenset(rank[perm] for perm in perms) for perms in perm_sets]
+        prefix_filter = _PrefixFilter(ranked_sets, sizes, DuplicateFinder.SIMILARITY_THRESHOLD)
+        nb_permsets = len(perm_sets)
+        if nb_permsets < DuplicateFinder.PROCESS_POOL_MIN_PERMSETS:
+            return prefix_filter.similar_pairs(range(nb_permsets))
+
+        # The comparisons are CPU bound: split them in strips of rows processed by different processes
+        nb_workers = os.cpu_count() or 1
+        strip_size = math.ceil(nb_permsets / (nb_workers * 4))
+        strips = [range(start, min(start + strip_size, nb_permsets)) for start in range(0, nb_permsets, strip_size)]
+        result: list[tuple[int, int, float]] = []
+        with ProcessPoolExecutor(max_workers=nb_workers, initializer=_init_worker, initargs=(prefix_filter,)) as executor:
+            for next_pairs in executor.map(_similar_pairs_worker, strips):
+                result.extend(next_pairs)
+        return sorted(result)
+
+    @staticmethod
+    def _similar_pairs_numpy(perm_sets: list[frozenset[ALL_PERMS_TYPE]], sizes: list[int]) -> list[tuple[int, int, float]]:
+        result: list[tuple[int, int, float]] = []
+        # Each permission set is stored as a row of bits, one bit per distinct permission
+        perm_to_idx: dict[ALL_PERMS_TYPE, int] = {}
+        rows: list[int] = []
+        cols: list[int] = []
+        for i, perms in enumerate(perm_sets):
+            for perm in perms:
+                rows.append(i)
+                cols.append(perm_to_idx.setdefault(perm, len(perm_to_idx)))
+        nb_words = max(1, (len(perm_to_idx) + 63) // 64)
+        bits = np.zeros((len(perm_sets), nb_words), dtype=np.uint64)
+        cols_array = np.array(cols, dtype=np.uint64)
+        np.bitwise_or.at(bits,
+                         (np.array(rows, dtype=np.intp), (cols_array >> np.uint64(6)).astype(np.intp)),
+                         np.left_shift(np.uint64(1), cols_array & np.uint64(63)))
+        sizes_array = np.array(sizes, dtype=np.int64)
+        for i in range(len(perm_sets) - 1):
+            if sizes[i] == 0:
+                continue
+            # |A ∩ B| / |A ∪ B| <= min(|A|, |B|) / max(|A|, |B|), so only the sets of similar sizes are compared
+            # (with the same 1e-9 tolerance as _PrefixFilter, so that both implementations return the same pairs)
+            other_sizes = sizes_array[i + 1:]
+            candidates = np.nonzero(np.minimum(other_sizes, sizes[i])
+                                    >= DuplicateFinder.SIMILARITY_THRESHOLD * np.maximum(other_sizes, sizes[i]) - 1e-9)[0] + i + 1
+            if len(candidates) == 0:
+                continue
+            intersections = _popcount(bits[i] & bits[candidates])
+            similarities = intersections / (sizes[i] + sizes_array[candidates] - intersections)
+            for k in np.nonzero(similarities >= DuplicateFinder.SIMILARITY_THRESHOLD)[0]:
+                result.append((i, int(candidates[k]), float(similarities[k])))
+        return result
+
+
+class _PrefixFilter:
+    """Finds the similar sets using prefix filtering, see DuplicateFinder._similar_pairs_python()"""
+
+    def __init__(self, ranked_sets: list[frozenset[int]], sizes: list[int], threshold: float) -> None:
+        self.ranked_sets = ranked_sets
+        self.sizes = sizes
+        self.threshold = threshold
+        # Sets are compared by increasing size, each one with the sets that come before it in that order
+        order = sorted(range(len(ranked_sets)), key=lambda k: sizes[k])
+        self.positions = [0] * len(ranked_sets)
+        for position, i in enumerate(order):
+            self.positions[i] = position
+        self.prefixes: list[list[int]] = []
+        self.index: dict[int, list[int]] = defaultdict(list)
+        for i, ranked_set in enumerate(ranked_sets):
+            # 1e-9 protects against floating point errors when SIMILARITY_THRESHOLD is changed: with some thresholds,
+            # threshold * size lands just above an integer (0.28 * 25 = 7.000000000000001), and ceil() would then
+            # return one too many, which would make the prefix too short and miss duplicates
+            prefix_length = sizes[i] - math.ceil(threshold * sizes[i] - 1e-9) + 1 if sizes[i] else 0
+            prefix = sorted(ranked_set)[:prefix_length]
+            self.prefixes.append(prefix)
+            for perm in prefix:
+                self.index[perm].append(i)
+
+    def similar_pairs(self, rows: range) -> list[tuple[int, int, float]]:
+        result: list[tuple[int, int, float]] = []
+        for i in rows:
+            size_i = self.sizes[i]
+            position_i = self.positions[i]
+            candidates: set[int] = set()
+            for perm in self.prefixes[i]:
+                candidates.update(self.index[perm])
+            for j in candidates:
+                if self.positions[j] >= position_i:
+                    continue
+                # |A ∩ B| / |A ∪ B| <= |B| / |A| when |B| <= |A| (with the same 1e-9 tolerance as the prefix length)
+                if self.sizes[j] < self.threshold * size_i - 1e-9:
+                    continue
+                intersection = len(self.ranked_sets[i] & self.ranked_sets[j])
+                similarity = intersection / (size_i + self.sizes[j] - intersection)
+                if similarity >= self.threshold:
+                    result.append((min(i, j), max(i, j), similarity))
+        return sorted(result)
+
+
+_worker_prefix_filter: _PrefixFilter | None = None
+
+
+def _init_worker(prefix_filter: _PrefixFilter) -> None:
+    # The prefix filter is sent once to each worker process instead of once per strip
+    global _worker_prefix_filter
+    _worker_prefix_filter = prefix_filter
+
+
+def _similar_pairs_worker(rows: range) -> list[tuple[int, int, float]]:
+    return _worker_prefix_filter.similar_pairs(rows)  # type: ignore
+
+
+def _popcount(words: "np.ndarray") -> "np.ndarray":
+    """Number of bits set in each row of a 2D uint64 array"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
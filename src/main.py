@@ -2,26 +2,70 @@ import argparse
 import json
 import logging
 import sys
-from dataclasses import asdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any
 
 from connection import Connection
-from data_classes import PermissionSet, SystemPermission, ObjectPermissions, FieldPermissions, SetupEntityAccess, \
-    PermissionSetTabSetting
+from data_classes import PermissionSet, ObjectPermissions, FieldPermissions, intern_system_permission, \
+    intern_setup_entity_access, intern_tab_setting
 from duplicate_finder import DuplicateFinder
 
+try:
+    import orjson
+except ImportError:  # orjson is optional: fall back to the standard json module
+    orjson = None  # type: ignore
+
 logging.basicConfig(level=logging.INFO,
                     format='%(levelname)s - %(funcName)s - %(message)s')
 logging.getLogger("urllib3").setLevel(logging.WARNING)
+log = logging.getLogger(__name__)
+
+# Salesforce limits the number of concurrent API requests, so keep this small
+MAX_WORKERS = 8
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def permset_to_dict(permset: PermissionSet) -> dict[str, Any]:
+    # Same as dataclasses.asdict() but without the recursive deep copy
+    return {
+        "id": permset.id,
+        "name": permset.name,
+        "label": permset.label,
+        "user_license": permset.user_license,
+        "permission_set_license": permset.permission_set_license,
+        "system_perms": [{"name": sp.name} for sp in permset.system_perms],
+        "object_perms": [{"sobject_type": op.sobject_type, "perms": op.perms} for op in permset.object_perms],
+        "field_perms": [{"sobject_type": fp.sobject_type, "sobject_field": fp.sobject_field, "perms": fp.perms}
+                        for fp in permset.field_perms],
+        "setup_entity_access": [{"setup_entity_type": se.setup_entity_type, "setup_entity_id": se.setup_entity_id}
+                                for se in permset.setup_entity_access],
+        "permission_set_tab_setting": [{"name": ts.name, "visibility": ts.visibility}
+                                       for ts in permset.permission_set_tab_setting],
+    }
 
 def write_json(permsets: list[PermissionSet]) -> None:
-    logging.debug(">> << write_json")
-    with open("permsets.json", "w") as file:
-        json.dump([asdict(p) for p in permsets], file, indent=2)
+    log.debug(">> << write_json")
+    # Permission sets are written one at a time to avoid building the whole document in memory
+    with open("permsets.json", "wb") as file:
+        file.write(b"[\n")
+        for i, p in enumerate(permsets):
+            if i > 0:
+                file.write(b",\n")
+            file.write(dumps(permset_to_dict(p)))
+        file.write(b"\n]\n")
 
 def read_json() -> list[PermissionSet]:
-    logging.debug(">> << read_json")
-    with open("permsets.json") as file:
-        data = json.load(file)
+    log.debug(">> << read_json")
+    with open("permsets.json", "rb") as file:
+        data = loads(file.read())
     permsets: list[PermissionSet] = []
     for d in data:
         permsets.append(
@@ -31,11 +75,16 @@ def read_json() -> list[PermissionSet]:
                 label=d["label"],
                 user_license=d.get("user_license"),
                 permission_set_license=d.get("permission_set_license"),
-                system_perms=[SystemPermission(**sp) for sp in d.get("system_perms", [])],
-                object_perms=[ObjectPermissions(**op) for op in d.get("object_perms", [])],
-                field_perms=[FieldPermissions(**fp) for fp in d.get("field_perms", [])],
-                setup_entity_access=[SetupEntityAccess(**se) for se in d.get("setup_entity_access", [])],
-                permission_set_tab_setting=[PermissionSetTabSetting(**ts) for ts in d.get("permission_set_tab_setting", [])],
+                system_perms=[intern_system_permission(sp["name"]) for sp in d.get("system_perms", [])],
+                object_perms=[ObjectPermissions(sobject_type=op["sobject_type"], perms=tuple(op["perms"]))
+                              for op in d.get("object_perms", [])],
+                field_perms=[FieldPermissions(sobject_type=fp["sobject_type"], sobject_field=fp["sobject_field"],
+                                              perms=tuple(fp["perms"]))
+                             for fp in d.get("field_perms", [])],
+                setup_entity_access=[intern_setup_entity_access(se["setup_entity_type"], se["setup_entity_id"])
+                                     for se in d.get("setup_entity_access", [])],
+                permission_set_tab_setting=[intern_tab_setting(ts["name"], ts["visibility"])
+                                            for ts in d.get("permission_set_tab_setting", [])],
             )
         )
     return permsets
@@ -54,6 +103,8 @@ def main():
     parser.add_argument('-d', '--domain', default='login', help='Salesforce domain (login, test, or custom)',
                         required=True)
     parser.add_argument('-s', '--sandbox', action='store_true', help='Connect to sandbox', required=False)
+    parser.add_argument('-b', '--bulk-api', action='store_true',
+                        help='Use the Bulk API 2.0 for large object and field permission queries', required=False)
     parser.add_argument('-l', '--load', action='store_true', help='Load previously saved permission sets', required=False)
     args = parser.parse_args()
 
@@ -65,50 +116,55 @@ def main():
             password=args.password,
             security_token=args.security_token,
             domain=args.domain,
-            sandbox=args.sandbox
+            sandbox=args.sandbox,
+            use_bulk_api=args.bulk_api
         )
         if not connection.connect():
             sys.exit(1)
 
-        logging.info("Loading system permissions")
+        log.info("Loading system permissions")
         all_perms = connection.get_all_system_perms()
-        logging.info(f"Successfully loaded {len(all_perms)} system permissions")
-        logging.info("Loading permission sets")
+        log.info("Successfully loaded %s system permissions", len(all_perms))
+        log.info("Loading permission sets")
         permsets = connection.get_permsets()
-        logging.info(f"Successfully loaded {len(permsets)} permission sets")
-        for i in range(len(permsets)):
-            next_permset = permsets[i]
-            logging.info(f"Loading permissions for permission set no {i+1}/{len(permsets)}: {next_permset.label}")
-            system_perms = connection.get_system_perms(permset_id=next_permset.id, all_perms=all_perms)
-            next_permset.system_perms = system_perms
-            object_perms = connection.get_object_perms(permset_id=next_permset.id)
-            next_permset.object_perms = object_perms
-            field_perms = connection.get_field_perms(permset_id=next_permset.id)
-            next_permset.field_perms = field_perms
-            setup_entity_access = connection.get_setup_entity_access(permset_id=next_permset.id)
-            next_permset.setup_entity_access = setup_entity_access
-            tab_setting = connection.get_tab_setting(permset_id=next_permset.id)
-            next_permset.permission_set_tab_setting = tab_setting
+        log.info("Successfully loaded %s permission sets", len(permsets))
+        log.info("Loading permissions for all permission sets")
+        permset_ids = [p.id for p in permsets]
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(connection.get_system_perms_bulk, permset_ids, all_perms): "system_perms",
+                executor.submit(connection.get_object_perms_bulk, permset_ids): "object_perms",
+                executor.submit(connection.get_field_perms_bulk, permset_ids): "field_perms",
+                executor.submit(connection.get_setup_entity_access_bulk, permset_ids): "setup_entity_access",
+                executor.submit(connection.get_tab_setting_bulk, permset_ids): "permission_set_tab_setting",
+            }
+            for future in as_completed(futures):
+                attribute = futures[future]
+                grouped = future.result()
+                for next_permset in permsets:
+                    setattr(next_permset, attribute, grouped[next_permset.id])
+                log.info("Successfully loaded %s for %s permission sets", attribute, len(permsets))
         write_json(permsets)
 
-    logging.info("Finding duplicates")
+    log.info("Finding duplicates")
     finder = DuplicateFinder(permsets)
     duplicates = finder.jaccard()
     for duplicate in duplicates:
-        logging.info("")
-        logging.info(f"Duplicate found: '{duplicate.permset1.get_displayable_label()}' and '{duplicate.permset2.get_displayable_label()}' with similarity {duplicate.similarity:.2f}")
-        logging.info(f"\tNo common permissions: {len(duplicate.common_perms())}")
+        log.info("")
+        log.info("Duplicate found: '%s' and '%s' with similarity %.2f", duplicate.permset1.get_displayable_label(),
+                 duplicate.permset2.get_displayable_label(), duplicate.similarity)
+        log.info("\tNo common permissions: %s", len(duplicate.common_perms()))
         if duplicate.similarity < 1.0:
             only_in_1 = duplicate.permset1_unique_perms()
             only_in_2 = duplicate.permset2_unique_perms()
             if only_in_1:
-                logging.info(f"\t'{duplicate.permset1.label}' unique permissions:")
+                log.info("\t'%s' unique permissions:", duplicate.permset1.label)
                 for perm in only_in_1:
-                    logging.info(f"\t\t{perm}")
+                    log.info("\t\t%s", perm)
             if only_in_2:
-                logging.info(f"\t'{duplicate.permset2.label}' unique permissions:")
+                log.info("\t'%s' unique permissions:", duplicate.permset2.label)
                 for perm in only_in_2:
-                    logging.info(f"\t\t{perm}")
+                    log.info("\t\t%s", perm)
 
 
 if __name__ == '__main__':